@@ -37,12 +37,14 @@ def compute_mom(df):
     df = df.copy()
     df['date'] = pd.to_datetime(df['date'])
     df['month'] = df['date'].dt.to_period('M')
+    df['pos_weight'] = df['position'] * df['impressions']
     agg = df.groupby('month').agg({
         'clicks': 'sum',
         'impressions': 'sum',
-        'ctr': lambda x: x.sum() / df.loc[x.index, 'impressions'].sum(),
-        'position': lambda x: (x * df.loc[x.index, 'impressions']).sum() / df.loc[x.index, 'impressions'].sum()
+        'pos_weight': 'sum'
     }).reset_index()
+    agg['ctr'] = agg['clicks'] / agg['impressions']
+    agg['position'] = agg.pop('pos_weight') / agg['impressions']
     agg['month'] = agg['month'].dt.to_timestamp()
     agg.rename(columns={'position': 'avg_position'}, inplace=True)
     agg['month_label'] = agg['month'].dt.strftime('%B %Y')
@@ -0,0 +1,194 @@
+import re
+import json
+import hashlib
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.ipc as ipc
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+from utils import init_logger
+
+logger = None
+
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+# Partition value for tables aggregated over the whole audit period
+PERIOD_PARTITION = 'all'
+
+METRIC_COLUMNS = ('clicks', 'impressions', 'ctr', 'position')
+
+def init_exporter(cfg):
+    global logger
+    logger = init_logger(cfg['logging']['file'], cfg['logging']['level'])
+
+
+def site_slug(site_url):
+    """
+    Filesystem-safe partition value for a GSC property URL. A short hash of the
+    full URL keeps http://, https:// and sc-domain: properties apart.
+    """
+    slug = re.sub(r'^https?://', '', site_url).strip('/')
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', slug) or 'site'
+    digest = hashlib.sha1(site_url.encode('utf-8')).hexdigest()[:8]
+    return f"{slug}-{digest}"
+
+
+def _month_keys(df):
+    """
+    Month partition (YYYY-MM) per row, taken from a 'date' or 'month' column.
+    Tables aggregated over the whole audit period go to PERIOD_PARTITION.
+    """
+    for col in ('date', 'month'):
+        if col in df.columns:
+            months = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m')
+            return months.fillna(PERIOD_PARTITION)
+    return pd.Series(PERIOD_PARTITION, index=df.index)
+
+
+def _raw_schema(columns):
+    """Fixed schema for fetch frames: dimensions are strings, metrics floats."""
+    return pa.schema([(c, pa.float64() if c in METRIC_COLUMNS else pa.string())
+                      for c in columns])
+
+
+def _read_schema(path, fmt):
+    if fmt == 'parquet':
+        return pq.read_schema(path)
+    with pa.memory_map(str(path)) as source:
+        return ipc.open_file(source).schema
+
+
+def _to_arrow(name, part, schema):
+    if schema is None:
+        return pa.Table.from_pandas(part, preserve_index=False)
+    if part.empty:
+        # empty fetch frames are zero-filled int64; don't let that leak into the schema
+        return schema.empty_table()
+    try:
+        return pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"{name} does not match its exported schema: {e}")
+
+
+def _write(table, path, fmt):
+    if fmt == 'parquet':
+        pq.write_table(table, path)
+    else:
+        # Uncompressed IPC file format so readers can memory-map it
+        with ipc.new_file(str(path), table.schema) as writer:
+            writer.write_table(table)
+
+
+def export_tables(tables, out_dir, site_url, start_date, end_date, fmt='parquet'):
+    """
+    Write each DataFrame as <out_dir>/<table>/site=<slug>/month=<YYYY-MM|all>/part-0.<ext>
+    (hive-style partitions) and update <out_dir>/manifest.json. Whole-period
+    aggregates use month=all; the period itself is recorded per site in the manifest.
+    `tables` maps table name -> (kind, DataFrame), kind being 'raw' or 'derived'.
+    """
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    slug = site_slug(site_url)
+
+    manifest_path = out_dir / 'manifest.json'
+    manifest = {'tables': {}}
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get('format') != fmt:
+            # mixing formats in one table directory breaks pyarrow.dataset
+            raise ValueError(f"{out_dir} already holds a {manifest.get('format')} export; "
+                             f"use another path for {fmt} or remove it first")
+
+    sites = manifest.setdefault('sites', {})
+    sites[slug] = {
+        'site_url': site_url,
+        'start_date': start_date,
+        'end_date': end_date,
+        'exported_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+    # Convert everything before touching disk, so a schema mismatch leaves
+    # the previous export intact
+    prepared = []
+    for name, (kind, df) in tables.items():
+        months = _month_keys(df)
+        # 'month' lives in the partition path; keep it out of the file schema
+        data = df.drop(columns=['month'], errors='ignore').reset_index(drop=True)
+        months = months.reset_index(drop=True)
+
+        entry = manifest['tables'].get(name) or {'files': []}
+        others = [f for f in entry['files'] if f['site'] != slug]
+        if others:
+            # every site's partitions share the schema of the first export
+            schema = _read_schema(out_dir / others[0]['path'], fmt)
+        elif kind == 'raw':
+            schema = _raw_schema(data.columns)
+        else:
+            schema = None
+        if schema is not None and set(schema.names) != set(data.columns):
+            raise ValueError(f"{name} columns {list(data.columns)} differ from "
+                             f"its exported schema {schema.names}")
+
+        if data.empty and schema is None:
+            # nothing to infer a schema from; a later export will define it
+            parts = []
+        else:
+            groups = list(data.groupby(months, sort=True)) or [(PERIOD_PARTITION, data)]
+            parts = [(month, _to_arrow(name, part, schema)) for month, part in groups]
+        prepared.append((name, kind, others, parts))
+
+    for name, kind, others, parts in prepared:
+        site_dir = out_dir / name / f"site={slug}"
+        if site_dir.exists():
+            # drop partitions from a previous export of this site
+            shutil.rmtree(site_dir)
+
+        entry = manifest['tables'].setdefault(name, {'files': []})
+        entry['kind'] = kind
+        entry['files'] = list(others)
+        for month, table in parts:
+            part_dir = site_dir / f"month={month}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            path = part_dir / f"part-0.{EXTENSIONS[fmt]}"
+            _write(table, path, fmt)
+            entry['files'].append({
+                'path': path.relative_to(out_dir).as_posix(),
+                'site': slug,
+                'month': month,
+                'rows': table.num_rows
+            })
+        if parts:
+            entry['columns'] = [{'name': f.name, 'type': str(f.type)}
+                                for f in parts[0][1].schema]
+        entry['partitioning'] = ['site', 'month']
+        entry['rows'] = sum(f['rows'] for f in entry['files'])
+        rows = sum(t.num_rows for _, t in parts)
+        logger.info(f"Exported {name}: {rows} rows, {len(parts)} partition(s)")
+
+    manifest['format'] = fmt
+    manifest['generated_at'] = datetime.now().isoformat(timespec='seconds')
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    logger.info(f"Columnar export saved: {manifest_path}")
+    return manifest_path
+
+
+def load_table(out_dir, name, columns=None, filter=None):
+    """
+    Read one exported table, projecting `columns` and pruning partitions with
+    a pyarrow.dataset `filter` expression, e.g. ds.field('month') == '2024-05'.
+    The file format is taken from the export's manifest; Arrow files are
+    memory-mapped, so their buffers are not copied into process memory.
+    """
+    fmt = json.loads((Path(out_dir) / 'manifest.json').read_text())['format']
+    dataset = ds.dataset(str((Path(out_dir) / name).resolve()),
+                         format='ipc' if fmt == 'arrow' else 'parquet',
+                         partitioning='hive',
+                         filesystem=fs.LocalFileSystem(use_mmap=True) if fmt == 'arrow' else None)
+    return dataset.to_table(columns=columns, filter=filter)
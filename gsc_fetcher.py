@@ -38,14 +38,15 @@ def list_properties(service, logger) -> list:
     logger.info(f'Found {len(sites)} properties')
     return sites
 
-def fetch_performance(service, logger, site_url,
-                      start_date, end_date,
-                      dimensions, filters=None) -> pd.DataFrame:
+def iter_performance_rows(service, logger, site_url,
+                          start_date, end_date,
+                          dimensions, filters=None,
+                          page_size=25000, max_rows=None, raise_errors=False):
     """
-    Fetch all available rows by paging through Search Console data.
-    Breaks when fewer than page_size rows are returned.
+    Yield Search Console rows one dict at a time, paging through the API.
+    Stops after max_rows rows when a cap is given. API errors are logged and
+    end the stream, or are re-raised when raise_errors is set.
     """
-    page_size = 25000
     body = {
         'startDate': start_date,
         'endDate': end_date,
@@ -55,15 +56,22 @@ def fetch_performance(service, logger, site_url,
     if filters:
         body['dimensionFilterGroups'] = [{'filters': filters}]
 
-    all_data = []
     start_row = 0
 
     while True:
+        if max_rows is not None:
+            remaining = max_rows - start_row
+            if remaining <= 0:
+                logger.info(f"Row cap of {max_rows} reached, stopping pagination.")
+                break
+            body['rowLimit'] = min(page_size, remaining)
         body['startRow'] = start_row
         try:
             resp = service.searchanalytics().query(siteUrl=site_url, body=body).execute()
         except Exception as e:
             logger.error(f"Fetch error at row {start_row}: {e}")
+            if raise_errors:
+                raise
             break
 
         rows = resp.get('rows', [])
@@ -83,15 +91,27 @@ def fetch_performance(service, logger, site_url,
             rec['impressions'] = row.get('impressions', 0)
             rec['ctr']         = row.get('ctr', 0)
             rec['position']    = row.get('position', 0)
-            all_data.append(rec)
+            yield rec
 
         start_row += fetched
 
-        # if we got fewer than page_size, that was the last page
-        if fetched < page_size:
+        # if we got fewer than requested, that was the last page
+        if fetched < body['rowLimit']:
             logger.info("Last page detected, stopping pagination.")
             break
 
+def fetch_performance(service, logger, site_url,
+                      start_date, end_date,
+                      dimensions, filters=None, max_rows=None) -> pd.DataFrame:
+    """
+    Fetch all available rows by paging through Search Console data.
+    Breaks when fewer than page_size rows are returned.
+    """
+    all_data = list(iter_performance_rows(
+        service, logger, site_url, start_date, end_date,
+        dimensions, filters=filters, max_rows=max_rows
+    ))
+
     df = pd.DataFrame(all_data)
     # Ensure all expected columns exist
     expected = [*dimensions, 'clicks', 'impressions', 'ctr', 'position']
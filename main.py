@@ -1,4 +1,6 @@
+import re
 import sys
+import time
 import argparse
 from datetime import datetime
 from pathlib import Path
@@ -12,12 +14,26 @@ from urllib.parse import urlparse
 from docx import Document
 
 from utils import load_config, init_logger
-from gsc_fetcher import authenticate, list_properties, fetch_performance
+from gsc_fetcher import authenticate, list_properties, fetch_performance, iter_performance_rows
 from analyzer import init_analyzer, compute_summary, segment_dataframe, detect_low_hanging, compute_mom, detect_anomalies
 from visualizer import init_visualizer, plot_pie, plot_multi_line
+from exporter import init_exporter, export_tables
+from sketches import HyperLogLog, ReservoirSample
 
 logger = None
 
+PREVIEW_DEFAULTS = {
+    'window_days':   28,
+    'max_rows':      25000,
+    'page_size':     5000,
+    'hll_precision': 12,
+    'sample_size':   1000,
+    'seed':          None
+}
+
+# Python-only regex features the Search Console API's RE2 filters reject
+RE2_UNSUPPORTED = re.compile(r'\(\?<?[=!]|\\[1-9]')
+
 def select_property(props):
     print("Available GSC Properties:")
     for i, p in enumerate(props, 1):
@@ -34,16 +50,8 @@ def get_folder(path):
     parts = [seg for seg in parsed.path.split('/') if seg]
     return parts[0] if parts else '/'
 
-def build_report(cfg, service, logger, site_url):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_dir = Path(cfg['output']['excel_path']).parent
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    excel_path = out_dir / f"{Path(cfg['output']['excel_path']).stem}_{ts}.xlsx"
-    md_path    = out_dir / f"{Path(cfg['output']['markdown_path']).stem}_{ts}.md"
-    docx_path  = out_dir / f"{Path(cfg['output']['docx_path']).stem}_{ts}.docx"
-
-    # Auto-detect end_date
+def resolve_end_date(cfg, service, logger, site_url):
+    """Fill in dates.end_date with the last day GSC has data for, if blank."""
     if not cfg['dates']['end_date']:
         df_dates = fetch_performance(
             service, logger, site_url,
@@ -55,14 +63,37 @@ def build_report(cfg, service, logger, site_url):
             if not df_dates.empty else cfg['dates']['start_date']
         )
         logger.info(f"Detected end_date: {cfg['dates']['end_date']}")
+    return cfg['dates']['end_date']
 
-    # Country filter
+def country_filters(cfg):
     base_filters = []
     country = cfg['filters'].get('country','')
     if country:
         base_filters.append({
             'dimension':'country','operator':'equals','expression':country
         })
+    return base_filters
+
+def export_columnar(cfg, logger, site_url, tables, out_dir):
+    columnar = cfg['output'].get('columnar') or {}
+    try:
+        export_tables(tables, columnar.get('path', str(out_dir / 'columnar')), site_url,
+                      cfg['dates']['start_date'], cfg['dates']['end_date'],
+                      fmt=columnar['format'])
+    except Exception as e:
+        logger.warning(f"Columnar export failed: {e}")
+
+def build_report(cfg, service, logger, site_url):
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path(cfg['output']['excel_path']).parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    excel_path = out_dir / f"{Path(cfg['output']['excel_path']).stem}_{ts}.xlsx"
+    md_path    = out_dir / f"{Path(cfg['output']['markdown_path']).stem}_{ts}.md"
+    docx_path  = out_dir / f"{Path(cfg['output']['docx_path']).stem}_{ts}.docx"
+
+    resolve_end_date(cfg, service, logger, site_url)
+    base_filters = country_filters(cfg)
 
     # 1) Fetch FULL dataset
     df_full = fetch_performance(
@@ -217,14 +248,40 @@ def build_report(cfg, service, logger, site_url):
         anoms_impr.to_excel(w,   'Anomalies_Impressions', index=False)
 
         # 6) Low-hanging opportunities (derive directly from df_full)
-        low_hanging = detect_low_hanging(df_full, **cfg['thresholds']['low_hanging'])
+        low_hanging = detect_low_hanging(df_full.copy(), **cfg['thresholds']['low_hanging'])
         low_hanging.to_excel(w, "LowHanging", index=False)
 
         df_folder_summary.to_excel(w, 'Folders_Multi', index=False)
 
-        df_folder_urls['urls'] = df_folder_urls['urls'].apply(lambda lst: "\n".join(lst))
-        df_folder_urls.to_excel(w, 'Folder_URLs', index=False)
-
+        (df_folder_urls
+            .assign(urls=df_folder_urls['urls'].apply(lambda lst: "\n".join(lst)))
+            .to_excel(w, 'Folder_URLs', index=False))
+
+    # Columnar export (Parquet / Arrow IPC) for downstream jobs
+    if (cfg['output'].get('columnar') or {}).get('format'):
+        tables = {
+            'raw_full':              ('raw',     df_full),
+            'raw_branded':           ('raw',     branded),
+            'raw_nonbranded':        ('raw',     nonb),
+            'raw_date_query':        ('raw',     df_dq),
+            'summary':               ('derived', pd.DataFrame([sum_o,sum_b,sum_nb,sum_an])),
+            'monthly_averages':      ('derived', avg_df),
+            'top_pages':             ('derived', top_pages),
+            'top_queries':           ('derived', top_queries),
+            'folders_overall':       ('derived', folder_summaries['Overall']),
+            'folders_branded':       ('derived', folder_summaries['Branded']),
+            'folders_nonbranded':    ('derived', folder_summaries['Non-Branded']),
+            'folders_multi':         ('derived', df_folder_summary),
+            'folder_urls':           ('derived', df_folder_urls),
+            'mom_overall':           ('derived', mom_o),
+            'mom_branded':           ('derived', mom_b),
+            'mom_nonbranded':        ('derived', mom_nb),
+            'daily':                 ('derived', daily),
+            'anomalies_clicks':      ('derived', anoms_clicks),
+            'anomalies_impressions': ('derived', anoms_impr),
+            'low_hanging':           ('derived', low_hanging)
+        }
+        export_columnar(cfg, logger, site_url, tables, out_dir)
 
     #     detect_low_hanging(df_full, **cfg['thresholds']['low_hanging']).to_excel(w, 'LowHanging', index=False)
     # logger.info(f"Excel saved: {excel_path}")
@@ -289,7 +346,7 @@ def build_report(cfg, service, logger, site_url):
     # 8) Actionable Insights
     drop = mom_o[mom_o['pct_clicks']<0]
     worst = drop.loc[drop['pct_clicks'].idxmin()] if not drop.empty else None
-    low_count = len(detect_low_hanging(df_full,**cfg['thresholds']['low_hanging']))
+    low_count = len(low_hanging)
 
     if cfg['output']['formats']['markdown']:
         with open(md_path,'w') as md:
@@ -324,13 +381,196 @@ def build_report(cfg, service, logger, site_url):
         except Exception as e:
             logger.warning(f"Word export failed: {e}")
 
+def build_preview(cfg, service, logger, site_url):
+    """
+    Quick approximate audit: Summary, TopPages/TopQueries and MoM from a few
+    small API calls, plus sketched distinct counts instead of the full page x query pull.
+    """
+    started = time.monotonic()
+    pcfg = {**PREVIEW_DEFAULTS, **(cfg.get('preview') or {})}
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = Path(cfg['output']['excel_path']).parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    excel_path = out_dir / f"{Path(cfg['output']['excel_path']).stem}_preview_{ts}.xlsx"
+    md_path    = out_dir / f"{Path(cfg['output']['markdown_path']).stem}_preview_{ts}.md"
+
+    end_date = resolve_end_date(cfg, service, logger, site_url)
+    start_date = cfg['dates']['start_date']
+    base_filters = country_filters(cfg)
+    regex = cfg['branded']['regex']
+    if RE2_UNSUPPORTED.search(regex):
+        raise ValueError("branded.regex uses lookaround or backreferences, which the "
+                         "GSC API (RE2) rejects; --preview cannot segment with it")
+    seg_filters = [
+        ('Branded',     {'dimension':'query','operator':'includingRegex','expression':regex}),
+        ('Non-Branded', {'dimension':'query','operator':'excludingRegex','expression':regex})
+    ]
+
+    # 1) Summary + MoM from per-segment totals and daily rows (tiny responses).
+    # As in build_report, Overall = Branded + Non-Branded: anonymized queries
+    # never appear in query-level rows, so they are reported separately.
+    totals, daily_by_seg = {}, {}
+    for label, fp in seg_filters:
+        seg_f = base_filters + [fp]
+        totals[label] = fetch_performance(service, logger, site_url,
+                                          start_date, end_date, [], filters=seg_f)
+        daily_by_seg[label] = fetch_performance(service, logger, site_url,
+                                                start_date, end_date, ['date'], filters=seg_f)
+    property_totals = fetch_performance(service, logger, site_url,
+                                        start_date, end_date, [], filters=base_filters)
+
+    property_clicks = int(property_totals['clicks'].sum())
+    if property_clicks and all(totals[label].empty for label, _ in seg_filters):
+        raise RuntimeError("Branded and Non-Branded fetches returned no rows while the "
+                           "property has clicks; check that branded.regex is valid RE2")
+    for label, _ in seg_filters:
+        if totals[label].empty:
+            logger.warning(f"No preview rows for segment '{label}'")
+
+    sum_b  = compute_summary(totals['Branded'],     'Branded')
+    sum_nb = compute_summary(totals['Non-Branded'], 'Non-Branded')
+    sum_o  = compute_summary(pd.concat([totals['Branded'], totals['Non-Branded']], ignore_index=True), 'Overall')
+    sum_an = compute_summary(totals['Branded'].iloc[0:0], 'Anonymous')
+    anon_clicks = max(property_clicks - sum_o['clicks'], 0)
+
+    mom_o  = compute_mom(pd.concat([daily_by_seg['Branded'], daily_by_seg['Non-Branded']],
+                                ignore_index=True))
+    mom_b  = compute_mom(daily_by_seg['Branded'])
+    mom_nb = compute_mom(daily_by_seg['Non-Branded'])
+    for df in (mom_o,mom_b,mom_nb):
+        df.insert(0, 'month_label', df.pop('month_label'))
+
+    # 2) Top lists: the API sorts by clicks, so the first 20 rows are exact
+    top_pages   = fetch_performance(service, logger, site_url, start_date, end_date,
+                                    ['page'], filters=base_filters, max_rows=20)
+    top_queries = fetch_performance(service, logger, site_url, start_date, end_date,
+                                    ['query'], filters=base_filters, max_rows=20)
+
+    # 3) Stream a short, row-capped page x query window through the sketches
+    window_start = max(
+        pd.Timestamp(start_date),
+        pd.Timestamp(end_date) - pd.Timedelta(days=pcfg['window_days'] - 1)
+    ).strftime("%Y-%m-%d")
+    hll_pages   = HyperLogLog(pcfg['hll_precision'])
+    hll_queries = HyperLogLog(pcfg['hll_precision'])
+    sample      = ReservoirSample(pcfg['sample_size'], seed=pcfg['seed'])
+    streamed = 0
+    stream_failed = False
+    try:
+        for rec in iter_performance_rows(service, logger, site_url,
+                                         window_start, end_date, ['page','query'],
+                                         filters=base_filters,
+                                         page_size=pcfg['page_size'],
+                                         max_rows=pcfg['max_rows'],
+                                         raise_errors=True):
+            streamed += 1
+            hll_pages.add(rec['page'])
+            hll_queries.add(rec['query'])
+            sample.add(rec)
+    except Exception as e:
+        stream_failed = True
+        logger.warning(f"Preview stream failed after {streamed} rows: {e}")
+    capped = pcfg['max_rows'] is not None and streamed >= pcfg['max_rows']
+    if capped:
+        logger.warning(f"Preview stream hit the {pcfg['max_rows']} row cap; "
+                       "distinct counts are lower bounds for the window.")
+    # Either way rows went unseen, so counts are only bounded from below
+    truncated = capped or stream_failed
+    partial_note = ("row cap reached" if capped else
+                    f"stream failed after {streamed} rows" if stream_failed else "")
+
+    # 4) Error bounds: ~95% (two standard errors) for HyperLogLog. Once the row
+    # cap is hit the unseen rows make the count unbounded above.
+    stats = []
+    for metric, hll in [('distinct_pages', hll_pages), ('distinct_queries', hll_queries)]:
+        est = hll.count()
+        margin = 2 * hll.relative_error * est
+        stats.append({'metric': metric, 'estimate': est,
+                      'lower': max(int(est - margin), 0),
+                      'upper': None if truncated else int(est + margin),
+                      'method': f"HyperLogLog p={hll.p} over {window_start}..{end_date}"
+                                + (f"; lower bound only, {partial_note}" if truncated else "")})
+    stats.append({'metric': 'rows_streamed', 'estimate': streamed,
+                  'lower': streamed, 'upper': None if truncated else streamed,
+                  'method': f"page x query {window_start}..{end_date}"
+                            + (f"; {partial_note}" if truncated else "")})
+    stats.append({'metric': 'anonymized_query_clicks',
+                  'estimate': anon_clicks,
+                  'lower': None, 'upper': None,
+                  'method': "property total minus Branded + Non-Branded; "
+                            "excluded from Overall, as in the full audit"})
+    stats.append({'metric': 'summary_and_mom', 'estimate': None,
+                  'lower': None, 'upper': None,
+                  'method': "API totals per segment via RE2 regex filters; property-level "
+                            "aggregation can differ slightly from the full audit's page x query sums"})
+    stats.append({'metric': 'top_pages_and_queries', 'estimate': None,
+                  'lower': None, 'upper': None,
+                  'method': "exact top 20 from the API; page totals include "
+                            "anonymized-query clicks, unlike the full audit"})
+    preview_stats = pd.DataFrame(stats, columns=['metric','estimate','lower','upper','method'])
+
+    with pd.ExcelWriter(excel_path, engine='openpyxl') as w:
+        pd.DataFrame([sum_o,sum_b,sum_nb,sum_an]).to_excel(w, 'Summary', index=False)
+        top_pages.to_excel(w, 'TopPages', index=False)
+        top_queries.to_excel(w, 'TopQueries', index=False)
+        mom_o.to_excel(w, 'MoM_Overall', index=False)
+        mom_b.to_excel(w, 'MoM_Branded', index=False)
+        mom_nb.to_excel(w, 'MoM_NonBranded', index=False)
+        preview_stats.to_excel(w, 'PreviewStats', index=False)
+        pd.DataFrame(sample.items).to_excel(w, 'PreviewSample', index=False)
+    logger.info(f"Preview Excel saved: {excel_path}")
+
+    # preview_ prefix keeps approximate tables apart from full-audit exports
+    if (cfg['output'].get('columnar') or {}).get('format'):
+        export_columnar(cfg, logger, site_url, {
+            'preview_summary':        ('derived', pd.DataFrame([sum_o,sum_b,sum_nb,sum_an])),
+            'preview_top_pages':      ('derived', top_pages),
+            'preview_top_queries':    ('derived', top_queries),
+            'preview_mom_overall':    ('derived', mom_o),
+            'preview_mom_branded':    ('derived', mom_b),
+            'preview_mom_nonbranded': ('derived', mom_nb),
+            'preview_stats':          ('derived', preview_stats)
+        }, out_dir)
+
+    if cfg['output']['formats']['markdown']:
+        with open(md_path,'w') as md:
+            md.write(f"# GSC Audit Preview for {site_url}\n\n")
+            md.write("_Approximate: totals use the API's RE2 regex filters and property-level "
+                     "aggregation; distinct counts are HyperLogLog estimates over "
+                     f"{window_start}..{end_date}._\n\n")
+            for s in [sum_o,sum_b,sum_nb]:
+                md.write(f"- **{s['segment']}**: Clicks={s['clicks']}, Impr={s['impressions']}, "
+                         f"CTR={s['ctr']:.2%}, AvgPos={s['avg_position']:.2f}\n")
+            md.write(f"- Anonymized-query clicks (not in Overall): {anon_clicks}\n")
+            md.write("\n## Estimates\n")
+            for row in stats[:2]:
+                if truncated:
+                    md.write(f"- {row['metric']}: at least {row['lower']} "
+                             f"({partial_note})\n")
+                else:
+                    md.write(f"- {row['metric']}: ~{row['estimate']} "
+                             f"({row['lower']}-{row['upper']})\n")
+            md.write("\n## Top Pages\n")
+            for _, r in top_pages.head(5).iterrows():
+                md.write(f"- {r['page']}: {r['clicks']:.0f} clicks\n")
+        logger.info(f"Preview Markdown saved: {md_path}")
+
+    logger.info(f"Preview finished in {time.monotonic() - started:.1f}s")
+
 def main():
     parser = argparse.ArgumentParser(description="GSC Audit Automation Tool")
     parser.add_argument('--config', default='config.yaml', help='Path to config YAML')
     parser.add_argument('--property', help='Site URL to audit')
+    parser.add_argument('--preview', action='store_true',
+                        help='Fast approximate audit using sampling and sketches')
+    parser.add_argument('--export', choices=['parquet', 'arrow'],
+                        help='Also write raw and derived tables as partitioned Parquet or Arrow IPC')
     args = parser.parse_args()
 
     cfg = load_config(args.config)
+    if args.export:
+        cfg['output']['columnar'] = {**(cfg['output'].get('columnar') or {}), 'format': args.export}
     global logger
     logger = init_logger(cfg['logging']['file'], cfg['logging']['level'])
 
@@ -346,7 +586,11 @@ def main():
 
     init_analyzer(cfg)
     init_visualizer(cfg)
-    build_report(cfg, service, logger, site_url)
+    init_exporter(cfg)
+    if args.preview:
+        build_preview(cfg, service, logger, site_url)
+    else:
+        build_report(cfg, service, logger, site_url)
 
 if __name__ == '__main__':
     main()
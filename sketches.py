@@ -0,0 +1,71 @@
+import math
+import random
+import hashlib
+
+
+def _hash64(value) -> int:
+    """Stable 64-bit hash (Python's built-in hash() is salted per process)."""
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimator using 2**precision registers.
+    Relative standard error is ~1.04 / sqrt(2**precision) (1.6% at precision=12).
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = [0] * self.m
+        if self.m == 16:
+            self.alpha = 0.673
+        elif self.m == 32:
+            self.alpha = 0.697
+        elif self.m == 64:
+            self.alpha = 0.709
+        else:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def add(self, value):
+        h = _hash64(value)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def count(self) -> int:
+        est = self.alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if est <= 2.5 * self.m and zeros:
+            # small-range correction (linear counting)
+            est = self.m * math.log(self.m / zeros)
+        return int(round(est))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+
+class ReservoirSample:
+    """Uniform sample of at most k items from a stream of unknown length (Algorithm R)."""
+
+    def __init__(self, k=1000, seed=None):
+        self.k = k
+        self.seen = 0
+        self.items = []
+        self._rng = random.Random(seed)
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        else:
+            j = self._rng.randrange(self.seen)
+            if j < self.k:
+                self.items[j] = item
+